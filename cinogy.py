@@ -14,186 +14,338 @@ import xmlrpc.client
 import time
 import sys
 import os
-import argparse
-import uuid
-import random
-import string
+import threading
+import ntpath
 
 
-proxy = xmlrpc.client.ServerProxy("http://localhost:8080/")
+SERVER_URL = "http://localhost:8080/"
+# RayCi runs on Windows, so saved paths are Windows paths whatever system this script runs on.
+DEFAULT_DIR = r"C:\CINOGY\RayCi Lite SDK\Python"
+CLOSE_GRACE = 0.2  # seconds the final closeAll call gets to reach the server before the program exits
+CAMERA_CACHE = os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "RayCi", "cam_cache.json")
+
+
+class KeepAliveTransport(xmlrpc.client.Transport):
+    """XML-RPC transport that keeps one HTTP connection open for the whole run.
+
+    The stock transport already caches its connection per host, this one also asks the server
+    to keep it alive, so consecutive calls share a single TCP connection instead of reconnecting.
+    Like the stock transport it accepts gzipped responses and sends requests uncompressed: a server that ignores
+    Content-Encoding answers a gzipped request with a Fault, which can't be told apart from a real one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("headers", [("Connection", "keep-alive")])
+        super().__init__(*args, **kwargs)
+        # The headers sent with every call never change, encode them once instead of on every call.
+        headers = list(self._headers)
+        if self.accept_gzip_encoding and xmlrpc.client.gzip:
+            headers.append(("Accept-Encoding", "gzip"))
+        headers.append(("Content-Type", "text/xml"))
+        headers.append(("User-Agent", self.user_agent))
+        self._encodedHeaders = [(name.encode("ascii"), value.encode("latin-1")) for name, value in headers]
+
+    def send_request(self, host, handler, request_body, debug):
+        connection = self.make_connection(host)
+        if debug:
+            connection.set_debuglevel(1)
+        connection.putrequest("POST", handler, skip_accept_encoding = True)
+        for name, value in self._encodedHeaders + self._extra_headers:
+            connection.putheader(name, value)
+        self.send_content(connection, request_body)
+        return connection
+
+    def parse_response(self, response):
+        # The stock transport feeds the (expat) parser in 1 KB reads, read the whole body and parse it at once.
+        data = response.read()
+        if response.getheader("Content-Encoding", "") == "gzip":
+            data = xmlrpc.client.gzip_decode(data, max_decode = -1)
+        if self.verbose:
+            print("body:", repr(data))
+        parser, unmarshaller = self.getparser()
+        parser.feed(data)
+        parser.close()
+        return unmarshaller.close()
+
+
+proxy = xmlrpc.client.ServerProxy(SERVER_URL, transport = KeepAliveTransport())
 RayCi = proxy.RayCi
 
+# Method handles are bound once, so every call is one dispatch instead of a chain of attribute lookups.
+_listLiveModes = RayCi.LiveMode.list
+_openLiveMode = RayCi.LiveMode.open
+_getIdCurrentCam = RayCi.LiveMode.Camera.getIdCurrentCam
+_getIdCamListSize = RayCi.LiveMode.Camera.getIdCamListSize
+_getIdCamListItem = RayCi.LiveMode.Camera.getIdCamListItem
+_newSnapshot = RayCi.LiveMode.Measurement.newSnapshot
+_saveAs = RayCi.Single.saveAs
+_adjustCrossSection = RayCi.Single.CrossSection.Adjustment.adjust
+_setAnalysisMethod = RayCi.Single.Analysis.Settings.setMethod
+_exportCrossSection = RayCi.Single.CrossSection.View.exportView
+_closeAllSingles = RayCi.Single.closeAll
+
+# The setters also run against a multicall, so they look their methods up by full dotted name,
+# which costs one attribute lookup on whichever server they are given.
+_SET_EXPOSURE_AUTO = "LiveMode.Camera.ExposureTime.setAutomatic"
+_SET_EXPOSURE_TIME = "LiveMode.Camera.ExposureTime.setExposureTime"
+_SET_GAIN_AUTO = "LiveMode.Camera.Gain.setAutomatic"
+_SET_GAIN = "LiveMode.Camera.Gain.setGain"
+_SET_FPS_AUTO = "LiveMode.Camera.FrameRate.setAutomatic"
+_SET_FPS = "LiveMode.Camera.FrameRate.setFrameRate"
+_SET_PIXEL_CLOCK_REDUCE = "LiveMode.Camera.PixelClock.setReduce"
+_SET_FLIP_HORIZONTAL = "LiveMode.Processing.Transform.setHorizontalFlip"
+_SET_FLIP_VERTICAL = "LiveMode.Processing.Transform.setVerticalFlip"
+_SET_ROTATE = "LiveMode.Processing.Transform.Rotate.setMethod"
+
+# Accepted spellings of the true/false flags and of the --rotate values (RayCi rotation method ids).
+_BOOL_MAP = {
+    'true': True, 't': True, 'True': True, 'TRUE': True, '1': True, 'yes': True,
+    'false': False, 'f': False, 'False': False, 'FALSE': False, '0': False, 'no': False,
+}
+_ROTATE_MAP = {"False": 0, "left": 1, "Left": 1, "l": 1, "right": 2, "Right": 2, "r": 2}
+
+# Cleared once the server turns out not to support system.multicall.
+_useMulticall = True
+
+# Set by -v, progress messages are printed only when it is on.
+_verbose = False
+
+# Help texts of the command line flags, keyed by flag name.
+_HELP = {
+    "exposure":
+        "Input exposure time value. *auto* for auto exposure. \n"
+        "Float value for updating the exposure, for example 2.0 or 2. \n"
+        "The value will be rounded to the closest value supported by RayCi software. \n \n",
+    "gain":
+        "\n"
+        "Input gain value. *auto* for auto gain.\n"
+        "Float value for updating the gain, for example 2.5x for 8Db gain. \n"
+        "The value will be rounded to the closest value supported by RayCi software \n \n",
+    "frames":
+        "Input frame rate value. *auto* for auto FPS. \n"
+        "Measured in frames per second, range: (1.0, 14.0) \n"
+        "The value will be rounded to the closest value supported by RayCi software \n \n",
+    "clock":
+        "Reduce pixel clock (-c), don't reduce pixel clock (--no-clock) \n \n",
+    "snapshot":
+        "Input a name of the file you want to save your picture as. \n"
+        "Files with the same name will be overriden. \n "
+        "If you don't specify this flag, a picture won't be taken at all. \n"
+        "Unless you use random name generator -r flag. \n \n",
+    "directory":
+        "Input a path to the directory you want to save your picture to. \n"
+        "After using -s flag you don't need to enter the name of the file anymore. \n"
+        "If not specified the picture will be saved to the default directory -> \n"
+        f"{DEFAULT_DIR} \n \n",
+    "random":
+        "If you don't want to name your pictures, use this flag. \n"
+        "It will generate random filenames for your pictures. \n"
+        "After using this flag, you don't need to specify the snapshot -s flag. \n \n",
+    "fliph":
+        "Use this flag if you want your image to be flipped horizontally. \n \n",
+    "flipv":
+        "Use this flag if you want your image to be flipped vertically. \n \n",
+    "rotate":
+        "Default value is set to False: no rotation. \n"
+        "Input 'left' for left rotation. \n"
+        "Input 'right' for right rotation \n \n",
+    "histogram":
+        "If you want to obtain a histogram as well use this flag :) \n \n",
+    "gaussian":
+        "Use this flag to see the Gaussian distribution in the histogram \n \n",
+    "verbose":
+        "Print which camera is used and where the picture and histogram were saved.",
+}
+
+def _report(message, *args):
+    """Prints a progress message, only when -v was given."""
+    if _verbose:
+        print(message % args)
+
+def warmUp():
+    """Opens the connection to RayCi with a cheap call, so the first real call finds it ready.
+
+    Errors are ignored here, an unreachable server is reported by the first real call.
+    """
+    try:
+        proxy.system.listMethods()
+    except (xmlrpc.client.Error, OSError):
+        pass
+
+def loadCameraCache():
+    """Reads the cached camera choices, one entry per RayCi server.
+
+    Returns:
+        dict: the cache, empty if the file is missing, unreadable or not a JSON object.
+    """
+    import json
+
+    try:
+        with open(CAMERA_CACHE) as cacheFile:
+            cache = json.load(cacheFile)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def saveCameraCache(cache):
+    """Writes the cached camera choices back. Failing to write the cache is not an error."""
+    import json
+
+    try:
+        os.makedirs(os.path.dirname(CAMERA_CACHE), exist_ok = True)
+        with open(CAMERA_CACHE, "w") as cacheFile:
+            json.dump(cache, cacheFile)
+    except OSError:
+        pass
+
 def selectCamera():
-    LiveModeList = RayCi.LiveMode.list()
+    """Finds the live mode document of the camera.
+
+    The camera used last time is read from CAMERA_CACHE and checked with a single getIdCurrentCam call.
+    Only if it is gone the live modes are listed again (and a new live mode is opened if needed).
+
+    Returns:
+        tuple: the id of the live mode document and whether a new live mode was opened.
+    """
+    cache = loadCameraCache()
+    cached = cache.get(SERVER_URL)
+    # A hand-edited or outdated entry counts as a miss.
+    if isinstance(cached, dict) and all(key in cached for key in ('nIdDoc', 'sName', 'sCamName')):
+        try:
+            camera = _getIdCurrentCam(cached['nIdDoc'])
+        except xmlrpc.client.Fault:
+            camera = None
+        if isinstance(camera, dict) and camera.get('sName') == cached['sCamName']:
+            _report("Using camera %s", cached['sName'])
+            return (cached['nIdDoc'], False)
+
+    IdDocLive = None
+    LiveModeList = _listLiveModes()
     for item in LiveModeList:
         if (item['sName'] != 'not connected'):
-            tempCamera = RayCi.LiveMode.Camera.getIdCurrentCam(item['nIdDoc'])
+            tempCamera = _getIdCurrentCam(item['nIdDoc'])
             if (tempCamera['sName'] != 'Video Stream'):
                 IdDocLive = item['nIdDoc']
                 CameraItem = item
                 OpenedLiveMode = False
                 break
     if IdDocLive == None:
-        CameraCount = RayCi.LiveMode.Camera.getIdCamListSize()
+        CameraCount = _getIdCamListSize()
         if CameraCount == 0:
             raise Exception('No camera found.')
-        CameraItem = RayCi.LiveMode.Camera.getIdCamListItem(-1, 0)
-        IdDocLive = RayCi.LiveMode.open ( CameraItem['nIdCamHigh'], CameraItem['nIdCamLow'])
-        print("Opened new live mode.")
+        CameraItem = _getIdCamListItem(-1, 0)
+        IdDocLive = _openLiveMode(CameraItem['nIdCamHigh'], CameraItem['nIdCamLow'])
+        _report("Opened new live mode.")
         OpenedLiveMode = True
-    print('Using camera', CameraItem['sName'])
+        tempCamera = _getIdCurrentCam(IdDocLive)
+    _report("Using camera %s", CameraItem['sName'])
+
+    cache[SERVER_URL] = {'nIdDoc': IdDocLive, 'sName': CameraItem['sName'], 'sCamName': tempCamera['sName']}
+    saveCameraCache(cache)
     return (IdDocLive, OpenedLiveMode)
 
 
 def generateRandom():
     """Helper function for random file names.
 
-    Using uuid library a unique id is generated (uniqueId) and concatenated with a random 8 letter string (randomChars).
+    A 32 character hex id (uniqueId) is concatenated with 8 more hex characters (randomChars), both taken from the secrets library.
 
     Returns:
         str: randomly generated file name.
     """
-    uniqueId = str(uuid.uuid4().hex)
-    randomChars = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
+    import secrets
+
+    uniqueId = secrets.token_hex(16)
+    randomChars = secrets.token_hex(4)
     filename = f"{uniqueId}_{randomChars}"
     return filename
 
+def _wantsHelp(argv):
+    """Checks if -h/--help (or an abbreviation of --help) is among the arguments."""
+    return any(arg == "-h" or (len(arg) > 2 and "--help".startswith(arg)) for arg in argv)
+
 def createParser():
     """Creates a parser for command line input.
 
     Defines the flags for user input and specifies the help messages. Uses argparse library.
+    The help messages (and the -h flag itself) are only handed to argparse when help was asked for.
+    If the arguments don't parse without them (-h can also hide in a cluster of short flags, like -vh),
+    they are parsed again with the full parser, which prints the help or the error.
 
     Returns:
         argparse: parsed arguments.
     """
-    parser = argparse.ArgumentParser(description = "Parser", formatter_class = argparse.RawTextHelpFormatter)
-
-    parser.add_argument("-e","--exposure", type = str, default = "auto", help = 
-            "Input exposure time value. *auto* for auto exposure. \n"
-            "Float value for updating the exposure, for example 2.0 or 2. \n"
-            "The value will be rounded to the closest value supported by RayCi software. \n \n")
-
-    parser.add_argument("-g", "--gain", type = str, default = "auto", help =
-            "\n"
-            "Input gain value. *auto* for auto gain.\n"
-            "Float value for updating the gain, for example 2.5x for 8Db gain. \n"
-            "The value will be rounded to the closest value supported by RayCi software \n \n" )
-
-    parser.add_argument("-fps", "--frames", type = str, default = "auto", help = 
-            "Input frame rate value. *auto* for auto FPS. \n"
-            "Measured in frames per second, range: (1.0, 14.0) \n"
-            "The value will be rounded to the closest value supported by RayCi software \n \n")
-        
-    parser.add_argument("-c", "--clock", type = str, default = "False", help = 
-            "Reduce pixel clock (true), don't reduce pixel clock (false) \n \n")
-
-    parser.add_argument("-s", "--snapshot", type = str, default = "False", help = 
-            "Input a name of the file you want to save your picture as. \n"
-            "Files with the same name will be overriden. \n "
-            "If you don't specify this flag, a picture won't be taken at all. \n"
-            "Unless you use random name generator -r flag. \n \n")
-    parser.add_argument("-d", "--directory", type = str, default = "False", help = 
-            "Input a path to the directory you want to save your picture to. \n"
-            "After using -s flag you don't need to enter the name of the file anymore. \n"
-            "If not specified the picture will be saved to the default directory -> \n"
-            "C:\CINOGY\RayCi Lite SDK\Python \n \n")
-    parser.add_argument("-r", "--random", type = str, default = "False", help = 
-            "If you don't want to name your pictures, set this flag to True. \n"
-            "It will generate random filenames for your pictures. \n"
-            "After setting this flag to True, you don't need to specify the snapshot -s flag. \n \n")
-    parser.add_argument("-fh", "--fliph", type = str, default = "False", help = 
-            "Set this flag to true if you want your image to be flipped horizontally. \n \n")
-    parser.add_argument("-fv", "--flipv", type = str, default = "False", help = 
-            "Set this flag to true if you want your image to be flipped vertically. \n \n")
-    parser.add_argument("-rt", "--rotate", type = str, default = "False", help = 
-            "Default value is set to False: no rotation. \n"
-            "Input 'left' for left rotation. \n"
-            "Input 'right' for right rotation \n \n")
-    parser.add_argument("-hist", "--histogram", type = str, default = "False", help = 
-            "If you want to obtain a histogram as well set this flag to 'true' :) \n \n")
-    parser.add_argument("-ga", "--gaussian", type = str, default = "False", help = 
-            "Set to 'true' to see the Gaussian distribution in the histogram")
+    import argparse
+
+    def build(withHelp):
+        helpFor = _HELP.get if withHelp else lambda dest: None
+        parser = argparse.ArgumentParser(description = "Parser", formatter_class = argparse.RawTextHelpFormatter, add_help = withHelp)
+
+        parser.add_argument("-e","--exposure", type = _parseExposure, default = "auto", help = helpFor("exposure"))
+        parser.add_argument("-g", "--gain", type = _parseGain, default = "auto", help = helpFor("gain"))
+        parser.add_argument("-fps", "--frames", type = _parseFPS, default = "auto", help = helpFor("frames"))
+        parser.add_argument("-c", "--clock", action = argparse.BooleanOptionalAction, default = False, help = helpFor("clock"))
+        parser.add_argument("-s", "--snapshot", type = str, default = None, help = helpFor("snapshot"))
+        parser.add_argument("-d", "--directory", type = str, default = None, help = helpFor("directory"))
+        parser.add_argument("-r", "--random", action = argparse.BooleanOptionalAction, default = False, help = helpFor("random"))
+        parser.add_argument("-fh", "--fliph", action = argparse.BooleanOptionalAction, default = False, help = helpFor("fliph"))
+        parser.add_argument("-fv", "--flipv", action = argparse.BooleanOptionalAction, default = False, help = helpFor("flipv"))
+        parser.add_argument("-rt", "--rotate", type = str, default = "False", help = helpFor("rotate"))
+        parser.add_argument("-hist", "--histogram", action = argparse.BooleanOptionalAction, default = False, help = helpFor("histogram"))
+        parser.add_argument("-ga", "--gaussian", action = argparse.BooleanOptionalAction, default = False, help = helpFor("gaussian"))
+        parser.add_argument("-v", "--verbose", action = "store_true", help = helpFor("verbose"))
+        return parser
+
+    if _wantsHelp(sys.argv[1:]):
+        return build(True).parse_args()
+
+    def retryWithHelp(message):
+        full = build(True)
+        full.parse_args()
+        # Only reached if the full parser accepts what the fast one didn't.
+        full.error(message)
+
+    parser = build(False)
+    parser.error = retryWithHelp
     args = parser.parse_args()
     return args
 
-def getExposure(exposureTimeArg):
-    """Deals with exposure time input.
+def _parseAutoFloat(label):
+    """Makes the argparse type for exposure time, gain and FPS input.
 
-    Checks if exposure was set to auto. If not, tries to assign it a float value. If it doesn't succeed - a user is prompted with an error message.
+    The returned function checks if the value was set to auto. If not, it tries to convert it to a float.
+    If it doesn't succeed argparse prompts the user with an error message naming the label.
 
     Args:
-        exposureTimeArg (str): User input to the -e flag.
+        label (str): what the value sets, for example "exposure time".
 
     Returns:
-        bool/float: Returns False for auto exposure and a float value for manual exposure.
+        function: str -> bool/float, False for auto and a float value for a manual setting.
     """
-    if exposureTimeArg == "auto":
-        exposureTime = False
-    else:
-        try:
-            exposureTime = float(exposureTimeArg)
-        except ValueError:
-            print("Invalid value for setting exposure time.")
-            sys.exit(1)
-    return exposureTime
-
-def getGain(gainArg):
-    """Deals with gain input.
-
-    Checks if gain was set to auto. If not, tries to assign it a float value. If it doesn't succeed - a user is prompted with an error message.
-
-    Args:
-        gainArg (str): User input to the -g flag.
-
-    Returns:
-        bool/float: Returns False for auto gain and a float value for manual gain.
-    """
-    if gainArg == "auto":
-        gain = False
-    else:
-        try: 
-            gain = float(gainArg)
-        except ValueError:
-            print("Invalid value for setting the gain.")
-            sys.exit(1)
-    return gain
-
-def getFPS(frameRateArg):
-    """Deals with FPS input.
-
-    Checks if frame rate was set to auto. If not, tries to assign it a float value. If it doesn't succeed - a user is prompted with an error message.
-
-    Args:
-        frameRateArg (str): User input to the -fps flag.
-
-    Returns:
-        bool/float: Returns False for auto frame rate and a float value for manual frame rate.
-    """
-    if frameRateArg == "auto":
-        frameRate = False
-    else:
-        try:
-            frameRate = float(frameRateArg)
-        except ValueError:
-            print("Invalid value for setting the frame rate.")
-            sys.exit(1)
-    return frameRate
-
-def setRotate(rotate, idDoc):
-    if rotate == "False":
-        RayCi.LiveMode.Processing.Transform.Rotate.setMethod(idDoc, 0)
-    elif rotate == "left" or rotate == "Left" or rotate == "l":
-        RayCi.LiveMode.Processing.Transform.Rotate.setMethod(idDoc, 1)
-    elif rotate == "right" or rotate == "Right" or rotate == "r":
-         RayCi.LiveMode.Processing.Transform.Rotate.setMethod(idDoc, 2)
-    else:
+    def parse(arg):
+        if arg == "auto":
+            return False
+        return float(arg)
+    # argparse names the type in its error message: "invalid exposure time value: 'x'".
+    parse.__name__ = label
+    return parse
+
+_parseExposure = _parseAutoFloat("exposure time")
+_parseGain = _parseAutoFloat("gain")
+_parseFPS = _parseAutoFloat("frame rate")
+
+def setRotate(rotate, idDoc, server = RayCi):
+    method = _ROTATE_MAP.get(rotate)
+    if method is None:
         print("Invalid input for rotate --rotate flag.")
         sys.exit(1)
+    getattr(server, _SET_ROTATE)(idDoc, method)
 
 def cleanStringInput(string):
     """Sorts out flexible user input.
 
     Checks user input and determine whether it should be True, False or invalid. This allows more flexibility.
+    The command line flags are parsed by argparse now, this is kept for scripts that import cinogy.
 
     Args:
         string (str): User input.
@@ -201,17 +353,13 @@ def cleanStringInput(string):
     Returns:
         bool: True or False.
     """
-    r = string
-    if r == 'true' or r == 't' or r == 'True' or r == 'TRUE':
-        s = True
-    elif r == 'false' or r == 'f' or r == 'False' or r == "FALSE":
-        s = False
-    else: 
-        print("Invalid value for specifying random filename flag. *true* to turn on the flag, *false* to turn it off.") 
-        sys.exit(1)
-    return s
+    value = _BOOL_MAP.get(string)
+    if value is not None:
+        return value
+    print("Invalid value for specifying random filename flag. *true* to turn on the flag, *false* to turn it off.") 
+    sys.exit(1)
 
-def setExposure(exposureTime, idDoc):
+def setExposure(exposureTime, idDoc, server = RayCi):
     """Sets the exposure time.
 
     Sets the exposure time to auto or updates the exposure time to a value specified by the user.
@@ -219,14 +367,15 @@ def setExposure(exposureTime, idDoc):
     Args:
         exposureTime (float/bool): either float (a value to be updated) or bool (false for auto exposure).
         idDoc (int): the id of the current documment (camera).
+        server: the RayCi namespace to call, either the proxy or a queued multicall.
     """
     if exposureTime == False:
-        RayCi.LiveMode.Camera.ExposureTime.setAutomatic(idDoc, True)
+        getattr(server, _SET_EXPOSURE_AUTO)(idDoc, True)
     else:
-        RayCi.LiveMode.Camera.ExposureTime.setAutomatic(idDoc, False)
-        RayCi.LiveMode.Camera.ExposureTime.setExposureTime(idDoc, exposureTime)
+        getattr(server, _SET_EXPOSURE_AUTO)(idDoc, False)
+        getattr(server, _SET_EXPOSURE_TIME)(idDoc, exposureTime)
 
-def setGain(gain, idDoc):
+def setGain(gain, idDoc, server = RayCi):
     """Sets the gain.
 
     Sets the gain to auto or updates the gain to a value specified by the user.
@@ -234,14 +383,15 @@ def setGain(gain, idDoc):
     Args:
         gain (float/bool): either float (a value to be updated) or bool (false for auto gain).
         idDoc (int): the id of the current documment (camera).
+        server: the RayCi namespace to call, either the proxy or a queued multicall.
     """
     if gain == False:
-        RayCi.LiveMode.Camera.Gain.setAutomatic(idDoc, True)
+        getattr(server, _SET_GAIN_AUTO)(idDoc, True)
     else:
-        RayCi.LiveMode.Camera.Gain.setAutomatic(idDoc, False)
-        RayCi.LiveMode.Camera.Gain.setGain(idDoc, gain)
+        getattr(server, _SET_GAIN_AUTO)(idDoc, False)
+        getattr(server, _SET_GAIN)(idDoc, gain)
 
-def setFPS(frameRate, idDoc):
+def setFPS(frameRate, idDoc, server = RayCi):
     """Sets the frame rate.
 
     Sets FPS to auto or updates  to a value it by the user.
@@ -249,104 +399,135 @@ def setFPS(frameRate, idDoc):
     Args:
         frameRate (float/bool): either float (a value to be updated) or bool (false for auto FPS).
         idDoc (int): the id of the current documment (camera).
+        server: the RayCi namespace to call, either the proxy or a queued multicall.
     """
     if frameRate ==  False:
-        RayCi.LiveMode.Camera.FrameRate.setAutomatic(idDoc, True)
+        getattr(server, _SET_FPS_AUTO)(idDoc, True)
     else:
-        RayCi.LiveMode.Camera.FrameRate.setAutomatic(idDoc, False)
-        RayCi.LiveMode.Camera.FrameRate.setFrameRate(idDoc, frameRate)
+        getattr(server, _SET_FPS_AUTO)(idDoc, False)
+        getattr(server, _SET_FPS)(idDoc, frameRate)
 
-def setPixelClock(pixelClockFlag, idDoc):
+def setPixelClock(pixelClockFlag, idDoc, server = RayCi):
     """Sets reduce pixel clock flag.
 
     Sets the pixel clock flag to on or off (specified by the user).
     Args:
         pixelClockFlag (bool): True - reduces the pixel clock, False - doesn't reduce.
         idDoc (int): the id of the current documment (camera).
+        server: the RayCi namespace to call, either the proxy or a queued multicall.
     """
     if pixelClockFlag == False:
-        RayCi.LiveMode.Camera.PixelClock.setReduce(idDoc, False)
+        getattr(server, _SET_PIXEL_CLOCK_REDUCE)(idDoc, False)
     elif pixelClockFlag == True:
-        RayCi.LiveMode.Camera.PixelClock.setReduce(idDoc, True)
+        getattr(server, _SET_PIXEL_CLOCK_REDUCE)(idDoc, True)
 
-def setFlipHorizontally(fliph, idDoc):
+def setFlipHorizontally(fliph, idDoc, server = RayCi):
     """Flips the screen horizontally if required.
 
     Args:
         fliph (bool): True - flips the image horizontally, False - doesn't.
         idDoc (int): the id of the current documment (camera).
+        server: the RayCi namespace to call, either the proxy or a queued multicall.
     """
-    RayCi.LiveMode.Processing.Transform.setHorizontalFlip(idDoc, fliph) 
+    getattr(server, _SET_FLIP_HORIZONTAL)(idDoc, fliph)
 
-def setFlipVertically(flipv, idDoc):
+def setFlipVertically(flipv, idDoc, server = RayCi):
     """Flips the screen vertically if required.
 
     Args:
         flipv (bool): True - flips the image vertically, False - doesn't.
         idDoc (int): the id of the current documment (camera).
+        server: the RayCi namespace to call, either the proxy or a queued multicall.
+    """
+    getattr(server, _SET_FLIP_VERTICAL)(idDoc, flipv)
+
+def configureCamera(settings, idDoc):
+    """Applies all camera settings in as few round trips as possible.
+
+    Queues every setter on one system.multicall request. If the server has no system.multicall, or a setter fails,
+    the setters are called one by one, in order, so the user sees the fault of the call that failed.
+
+    Args:
+        settings (list): (setter, value) pairs, each setter is called as setter(value, idDoc, server).
+        idDoc (int): the id of the current documment (camera).
     """
-    RayCi.LiveMode.Processing.Transform.setVerticalFlip(idDoc, flipv) 
+    global _useMulticall
+    if _useMulticall:
+        multicall = xmlrpc.client.MultiCall(proxy)
+        for setter, value in settings:
+            setter(value, idDoc, multicall.RayCi)
+        try:
+            results = multicall()
+        except xmlrpc.client.Fault:
+            _useMulticall = False
+        else:
+            try:
+                list(results)
+                return
+            except xmlrpc.client.Fault:
+                # The whole batch has been answered, nothing is still running on the server.
+                pass
+
+    for setter, value in settings:
+        setter(value, idDoc)
 
 def saveTheSnapshot(random, directoryArg, snapshotArg, idDoc):
     """Saves the snapshot according to directory and file name specified by the user.
 
-    Sorts out the saving of the file. Checks if random name generation is required. Looks if the path is specified or should the file be saved to a default directory.
+    Works out the path first (random or user specified name, user specified or default directory), then takes and saves the snapshot.
 
     Args:
         random (bool): flag for random file name generation.
-        directoryArg (str): a user specified directory.
-        snapshotArg (str): a user specified file name.
+        directoryArg (str): a user specified directory, None for the default directory.
+        snapshotArg (str): a user specified file name, None if not given.
         idDoc (int): the id of the current documment (camera).
+
+    Returns:
+        tuple: the id of the captured document and the path it was saved to.
     """
-    if directoryArg == "False":
-        if random == True:
-            fileName = generateRandom()
-            saveTo = "C:\CINOGY\RayCi Lite SDK\Python" + "\\" + fileNames
-            capture = RayCi.LiveMode.Measurement.newSnapshot(idDoc)
-            RayCi.Single.saveAs(capture, saveTo, True)
-            print("The picture has been successfully saved to: ", saveTo)
-            return capture, saveTo
-            
-        elif snapshotArg == "False":
-            print("No picture taken. Specify the file name (-s --snapshot) and/or the name of the directory (-d --directory)")
-            sys.exit(1)
-        elif snapshotArg != "False":
-            saveTo = "C:\CINOGY\RayCi Lite SDK\Python" + "\\" + snapshotArg 
-            capture = RayCi.LiveMode.Measurement.newSnapshot(idDoc)
-            RayCi.Single.saveAs(capture, saveTo, True)
-            print("The picture has been successfully saved to: ", saveTo)
-            return capture, saveTo
-    
-    elif directoryArg != "False":
-        if snapshotArg == "False":
-            if random == True:
-                fileName = generateRandom()
-                saveTo = directoryArg + "\\" + fileName
-                capture = RayCi.LiveMode.Measurement.newSnapshot(idDoc)
-                RayCi.Single.saveAs(capture, saveTo, True)
-                print("The picture has been successfully saved to: ", saveTo)
-                return capture, saveTo
-            else:
-                print("No picture taken. Only specify the directory with -d/--directory flag. Use flag -s or --spanshot to set the name of the file.")
-                sys.exit(1)
-        elif snapshotArg != "False":
-            saveTo = directoryArg + "\\" + snapshotArg
-            capture = RayCi.LiveMode.Measurement.newSnapshot(idDoc)
-            RayCi.Single.saveAs(capture,saveTo ,True)
-            print("The picture has been successfully saved to: ", saveTo)
-            return capture, saveTo
+    base = directoryArg if directoryArg is not None else DEFAULT_DIR
+    name = generateRandom() if random else snapshotArg
+    if name is None:
+        print("No picture taken. Specify the file name (-s --snapshot) or use random file names (-r --random).")
+        sys.exit(1)
+    saveTo = ntpath.normpath(ntpath.join(base, name))
+
+    capture = _newSnapshot(idDoc)
+    _saveAs(capture, saveTo, True)
+    _report("The picture has been successfully saved to: %s", saveTo)
+    return capture, saveTo
 
 def makeHistogram(single, path, gaussian):
+    """Exports the cross section histogram of a captured document next to its picture.
+
+    Args:
+        single (int): the id of the captured document.
+        path (str): the path the picture was saved to.
+        gaussian (bool): True - shows the Gaussian distribution in the histogram.
+    """
     path = path + "-histogram.png"
-    RayCi.Single.CrossSection.Adjustment.adjust(single,0)
+    _adjustCrossSection(single, 0)
 
     if gaussian:
-        RayCi.Single.Analysis.Settings.setMethod(single,3)
+        _setAnalysisMethod(single, 3)
 
-    RayCi.Single.CrossSection.View.exportView(single, 0, path, 1600, 1200, "CINOGY")
-    print("The histogram has been successfully saved to: ", path)
+    _exportCrossSection(single, 0, path, 1600, 1200, "CINOGY")
+    _report("The histogram has been successfully saved to: %s", path)
     return
 
+def closeSingles(errors):
+    """Closes all captured documents in RayCi.
+
+    Runs on its own thread, so a failure is handed back in errors instead of being raised.
+
+    Args:
+        errors (list): the error is appended to it if the call fails.
+    """
+    try:
+        _closeAllSingles(True)
+    except (xmlrpc.client.Error, OSError) as error:
+        errors.append(error)
+
 
 def main():
     """The main driver of this program.
@@ -356,30 +537,39 @@ def main():
     3. Sets the arguments specified by the user.
     4. Takes a picture of the laser beam with the specified parameters.
     """
+    global _verbose
+    # Connect to RayCi while the arguments are parsed.
+    warmer = threading.Thread(target = warmUp, daemon = True)
+    warmer.start()
     args = createParser()
-
-    exposureTime = getExposure(args.exposure)
-    gain = getGain(args.gain)
-    frameRate = getFPS(args.frames)
-    pixelClockFlag = cleanStringInput(args.clock)
-    random = cleanStringInput(args.random)
-    fliph = cleanStringInput(args.fliph)
-    flipv = cleanStringInput(args.flipv)
-    histogram = cleanStringInput(args.histogram)
-    gaussian = cleanStringInput(args.gaussian)
+    _verbose = args.verbose
+
+    exposureTime = args.exposure
+    gain = args.gain
+    frameRate = args.frames
+    pixelClockFlag = args.clock
+    random = args.random
+    fliph = args.fliph
+    flipv = args.flipv
+    histogram = args.histogram
+    gaussian = args.gaussian
   
 
+    warmer.join()
     idDoc, liveMode = selectCamera()
  
-    setExposure(exposureTime, idDoc)
-    setGain(gain, idDoc)
-    setFPS(frameRate, idDoc)
-    setPixelClock(pixelClockFlag, idDoc)
-    setFlipHorizontally(fliph, idDoc)
-    setFlipVertically(flipv, idDoc)
-    rotate = setRotate(args.rotate, idDoc)
-
-    
+    configureCamera([
+        (setExposure, exposureTime),
+        (setGain, gain),
+        (setFPS, frameRate),
+        (setPixelClock, pixelClockFlag),
+        (setFlipHorizontally, fliph),
+        (setFlipVertically, flipv),
+        (setRotate, args.rotate),
+    ], idDoc)
+    # Let the camera deliver about three frames with the new settings before the snapshot,
+    # auto frame rate is assumed to run at the maximum of 14 FPS.
+    time.sleep(max(3.0 / max(frameRate or 14.0, 1.0), 0.05))
 
     snapshotArg = args.snapshot
     directoryArg = args.directory
@@ -389,9 +579,16 @@ def main():
         makeHistogram(single, filePath, gaussian)
  
     # RayCi.LiveMode.closeAll(True)
-    RayCi.Single.closeAll(True)
+    # Nothing depends on the reply to closeAll, so it is only given time to be sent.
+    closeErrors = []
+    closer = threading.Thread(target = closeSingles, args = (closeErrors,), daemon = True)
+    closer.start()
+    closer.join(CLOSE_GRACE)
+    if closeErrors:
+        print(f"Could not close the captured pictures in RayCi: {closeErrors[0]}")
+        return 1
+    return 0
 
-    
 
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file